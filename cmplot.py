@@ -21,12 +21,58 @@
     Online documentation: <https://cmplot.readthedocs.io>
 """
 
-from random import shuffle, randint
 from scipy.stats import t
 import plotly.graph_objects as go
 import numpy as np
 import pandas as pd
 
+try:
+    from numba import njit
+except ImportError: #numba is optional: fall back to plain numpy
+    njit = None
+
+_rng = np.random.default_rng() #sampler for the posterior of the bayesian t-test
+_call_counter = 0 #rotates the point symbols at each call of cmplot
+_AUTO_POINTSMAXDISPLAYED = 5000 #raw points drawn per distribution by default
+
+#colour palettes' templates, to be filled with the hue
+_FILL_COLOR = "hsla(%d, 50%%, 50%%, 0.3)"
+_LINE_COLOR = "hsla(%d, 20%%, 20%%, 0.8)"
+_MARKERLINE_COLOR = "hsla(%d, 20%%, 20%%, 0.4)"
+_MARKERFILL_COLOR = "hsla(%d, 70%%, 70%%, 1)"
+_CIFILL_COLOR = "hsla(%d, 45%%, 45%%, 0.4)"
+_BOXLINE_COLOR = "hsla(%d, 30%%, 30%%, 1)"
+_OUTLIER_COLOR = "hsla(%d, 50%%, 50%%, 0.9)"
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _hdi_search(sorted_points, ci_idx_inc):
+        """
+        Shortest interval spanning ci_idx_inc points in a sorted array,
+        found in a single pass with no temporary array
+        Returns: low and hi range of the interval
+        """
+        n_ci = len(sorted_points) - ci_idx_inc
+        min_idx = 0
+        min_width = sorted_points[ci_idx_inc] - sorted_points[0]
+        for i in range(1, n_ci):
+            width = sorted_points[i + ci_idx_inc] - sorted_points[i]
+            if width < min_width:
+                min_width = width
+                min_idx = i
+        return sorted_points[min_idx], sorted_points[min_idx + ci_idx_inc]
+else:
+    def _hdi_search(sorted_points, ci_idx_inc):
+        """
+        Shortest interval spanning ci_idx_inc points in a sorted array
+        Returns: low and hi range of the interval
+        """
+        n_ci = len(sorted_points) - ci_idx_inc
+        ci_widths = sorted_points[ci_idx_inc:] - sorted_points[:n_ci]
+        min_idx = ci_widths.argmin()
+        return sorted_points[min_idx], sorted_points[min_idx + ci_idx_inc]
+
 
 def cmplot(data_frame: pd.core.frame.DataFrame, xcol=None, ycol=None,
            xsuperimposed=False, xlabel=None, ylabel=None, title=None,
@@ -35,7 +81,8 @@ def cmplot(data_frame: pd.core.frame.DataFrame, xcol=None, ycol=None,
            altsidesflip=False, spanmode=None, showpoints=True,
            pointsoverdens=False, pointsopacity=0.4, markoutliers=True,
            colorrange=None, colorshift=0, pointshapes=None,
-           pointsdistance=0.6, pointsmaxdisplayed=0):
+           pointsdistance=0.6, pointsmaxdisplayed=None, webgl=False,
+           densitymaxpoints=0, seed=None):
     """
     Cloudy Mountain Plot:
         an RDI (Raw data, Descriptive statistics, and Inferential data)
@@ -169,20 +216,47 @@ def cmplot(data_frame: pd.core.frame.DataFrame, xcol=None, ycol=None,
         * pointshapes: array of strings
 
         You can specify manually which symbols to use for each distribution
-        plotted. If not specified, a random symbol is chosen for each
-        distribution.
+        plotted. If not specified, the symbols chosen for the distributions
+        change at each call (see `seed`).
 
         * pointsdistance: float, range 0-1, default is 0.6
 
         Distance at which data points will be plotted, measured from the base of
         the density curve. 0 is at the base, 1 is at the top.
 
-        * pointsmaxdisplayed: integer, default is 0
+        * pointsmaxdisplayed: integer, default is None
 
-        This option sets the maximum number of points to be drawn on the graph.
-        The default value '0' corresponds to no limit (plot all points). This
-        option can be useful when the data amount is massive and would prove
-        inefficient or inelegant to plot.
+        This option sets the maximum number of points to be drawn for each
+        distribution; when there are more values, a random subset of them is
+        drawn. If not specified, at most 5000 points per distribution are drawn.
+        The value '0' corresponds to no limit (plot all points). This option can
+        be useful when the data amount is massive and would prove inefficient or
+        inelegant to plot.
+
+        * webgl: boolean, default is False
+
+        Set to True to draw the data points with WebGL (as a Scattergl trace)
+        instead of SVG, which renders much faster when there are many points.
+        The points are then drawn along the base line of each distribution,
+        without jitter.
+
+        * densitymaxpoints: integer, default is 0
+
+        This option sets the maximum number of values from which the kernel
+        density curve of each distribution is drawn. When there are more values,
+        the curve (and the mini boxplot of the inference band) is drawn from that
+        many evenly spaced quantiles of the data, with the bandwidth computed
+        beforehand on all the values (Silverman's rule); the outliers, beyond
+        1.5 IQR from the quartiles, are still marked among all the values. The
+        default value '0' corresponds to no limit (use all values).
+        This option can be useful when the data amount is massive and the
+        density curves would be slow to render.
+
+        * seed: integer, default is None
+
+        Set to make the plot reproducible: it fixes the choice of the point
+        symbols and the random sampling (Bayesian posterior, subset of points
+        displayed). If not specified, the symbols change at each call.
 
         * colorrange: integer, default is None
 
@@ -201,21 +275,84 @@ def cmplot(data_frame: pd.core.frame.DataFrame, xcol=None, ycol=None,
         avoid having distributions plotted with the same colour.
 
     Returns:
-        * traces: list of instances of plotly.graph_objs.Violin
+        * traces: list of violin trace dictionaries (plus scattergl ones when
+          `webgl` is set), to be passed to plotly.graph_objs.Figure
         * layout: instance of plotly.graph_objs.Layout
     """
+    global _call_counter #rotates the point symbols when no seed is given
 
     # # 0) Helper functions:
-    def t_test_ci(x_val, conf_level=0.95):
+    def t_test_ci(xmean, xstd, num, conf_level=0.95):
         """
         t_test confidence interval: T-distribution based confidence interval when
             population variance is unknown
         note: the t-confidence interval hinges on the normality assumption
             of the data
+        Arguments:
+            xmean, xstd, num=mean, standard deviation and size of the sample
+            conf_level (default 0.95)
+        """
+        deg_freedom = num - 1
+        return t.interval(conf_level, deg_freedom, loc=xmean,
+                          scale=xstd / np.sqrt(num))
+
+    def iqr(x_val):
+        """
+        InterQuartileRange: 25th and 75th percentiles (linear interpolation),
+            selected with a single partial sort of the values (missing ones dropped)
+        Returns: low and hi range for the IQR
+        """
+        x_val = x_val[~pd.isna(x_val)]
+        positions = (len(x_val) - 1) * np.array([0.25, 0.75])
+        lows = np.floor(positions).astype('int')
+        highs = np.ceil(positions).astype('int')
+        partitioned = np.partition(x_val, np.concatenate((lows, highs)))
+        lo_vals = partitioned[lows]
+        quartiles = lo_vals + (partitioned[highs] - lo_vals) * (positions - lows)
+        return quartiles[0], quartiles[1]
+
+    def sorted_quantiles(sorted_val, quantiles):
         """
-        deg_freedom = len(x_val) - 1
-        return t.interval(conf_level, deg_freedom, loc=np.mean(x_val),
-                          scale=np.std(x_val) / np.sqrt(len(x_val)))
+        Quantiles (linear interpolation) of already sorted values, read off
+            the array without sorting it again
+        Returns: array of the quantiles
+        """
+        positions = (len(sorted_val) - 1) * np.asarray(quantiles)
+        return np.interp(positions, np.arange(len(sorted_val)), sorted_val)
+
+    def sorted_outliers(sorted_val):
+        """
+        Outliers of already sorted values: those beyond 1.5 IQR from the
+            quartiles, as marked by the boxplot
+        Returns: array of the outliers
+        """
+        q_1, q_3 = sorted_quantiles(sorted_val, [0.25, 0.75])
+        lo_fence = np.searchsorted(sorted_val, q_1 - 1.5 * (q_3 - q_1))
+        hi_fence = np.searchsorted(sorted_val, q_3 + 1.5 * (q_3 - q_1), side='right')
+        return np.concatenate((sorted_val[:lo_fence], sorted_val[hi_fence:]))
+
+    def silverman_bandwidth(sorted_val):
+        """
+        Kernel density bandwidth by Silverman's rule of thumb, computed as
+            plotly does for its violin traces (at least 1/100 of the span)
+        Arguments:
+            sorted_val=sorted array of values
+        Returns: bandwidth
+        """
+        q_1, q_3 = sorted_quantiles(sorted_val, [0.25, 0.75])
+        spread = min(np.std(sorted_val, ddof=1), (q_3 - q_1) / 1.349)
+        return max(1.059 * spread * len(sorted_val) ** -0.2,
+                   (sorted_val[-1] - sorted_val[0]) / 100)
+
+    def violin_data(orientation, x_0, values):
+        """
+        Places the values of a violin trace at position x_0 of the categorical
+            axis, according to the orientation of the plot
+        Returns: dictionary of the trace's x0/y (or y0/x) entries
+        """
+        if orientation == "v":
+            return {'x0': x_0, 'y': values}
+        return {'y0': x_0, 'x': values}
 
     def hdi_from_mcmc(posterior_samples, credible_mass=0.95):
         """
@@ -230,32 +367,27 @@ def hdi_from_mcmc(posterior_samples, credible_mass=0.95):
             credible_mass (default 0.95)
         Returns: low and hi range for the HDI
         """
-        sorted_points = sorted(posterior_samples)
-        ci_idx_inc = np.ceil(credible_mass * len(sorted_points)).astype('int')
-        n_ci = len(sorted_points) - ci_idx_inc
-        ci_width = [0] * n_ci
-        for i in range(0, n_ci):
-            ci_width[i] = sorted_points[i + ci_idx_inc] - sorted_points[i]
-        hdi_min = sorted_points[ci_width.index(min(ci_width))]
-        hdi_max = sorted_points[ci_width.index(min(ci_width)) + ci_idx_inc]
-        return hdi_min, hdi_max
-
-    def ttest_bayes_ci(x_val, iterations=1000, credible_mass=0.95):
+        sorted_points = np.sort(np.asarray(posterior_samples))
+        ci_idx_inc = int(np.ceil(credible_mass * len(sorted_points)))
+        if len(sorted_points) - ci_idx_inc <= 0: #no interval narrower than the whole sample
+            raise ValueError("credible mass too high for the number of posterior samples, \
+                    lower conf_level or raise hdi_iter")
+        return _hdi_search(sorted_points, ci_idx_inc)
+
+    def ttest_bayes_ci(xmean, xstd, num, iterations=1000, credible_mass=0.95):
         """
         Originally from https://github.com/tszanalytics/BayesTesting.jl
         Adapted and extended by Giuseppe Insana on 2019.08.19
         Arguments:
-            x_val=array of values
+            xmean, xstd, num=mean, standard deviation and size of the sample
             iterations=iterations for samples of posterior
             credible_mass (for HDI highest density interval)
         Returns:
             hdi: highest density interval of posterior for specified credible_mass
         """
-        num = len(x_val)
         dof = num - 1
-        xmean = np.mean(x_val)
-        std_err = np.std(x_val) / np.sqrt(num)
-        t_s = std_err * t.rvs(dof, size=iterations) + xmean
+        std_err = xstd / np.sqrt(num)
+        t_s = std_err * rng.standard_t(dof, size=iterations) + xmean
         hdi = hdi_from_mcmc(t_s, credible_mass=credible_mass)
         return hdi
 
@@ -320,12 +452,21 @@ def ttest_bayes_ci(x_val, iterations=1000, credible_mass=0.95):
                   " ylabel overrides but you are plotting ", len(ysymbols),
                   " dependent variables => labels will be cycled")
 
+    if pointsmaxdisplayed is None:
+        pointsmaxdisplayed = _AUTO_POINTSMAXDISPLAYED
+
+    if densitymaxpoints != 0 and densitymaxpoints < 2:
+        raise ValueError("densitymaxpoints should be either 0 (no limit) or at least 2")
+
     if spanmode is None:
         spanmode = 'soft'
+
     else:
         if spanmode not in ('soft', 'hard'):
             raise ValueError("if defining spanmode, only 'soft' and 'hard' are allowed values")
 
+    rng = _rng if seed is None else np.random.default_rng(seed)
+
     # # 2) divide up data by xsymbols and then ysymbol and calculate stats, preparing datas array:
 
     datas = []
@@ -334,13 +475,27 @@ def ttest_bayes_ci(x_val, iterations=1000, credible_mass=0.95):
     xlabelsoverride = {} #useful when xsuperimposed
     xlabelindex = 0
     ylabelindex = 0
-    rand_int = randint(1, 10000)
+    rand_int = rng.integers(1, 10001) #keeps scalegroups distinct when joining plots
+    scalegroup_ids = {} #short scalegroup id for each xvalue
+
+    if inf in ('hdi', 'ci'): #per-group descriptive stats, computed once for all Ys
+        grouped_ys = data_frame.groupby(xsymbols, observed=True)[ysymbols]
+        y_means = grouped_ys.mean()
+        y_stds = grouped_ys.std(ddof=0)
+        y_counts = grouped_ys.count()
+
+    xname = "&".join(xsymbols)
 
     #separating distributions for each categorical x:
-    for label, sub_data_frame in data_frame.groupby(xsymbols):
-        for ysymbol in ysymbols: #by default for all Ys present (or all those specified)
-            xvalue = label if not isinstance(label, tuple) else "&".join([str(x) for x in label])
-            xname = "&".join(xsymbols)
+    for label, sub_data_frame in data_frame.groupby(xsymbols, observed=True):
+        xvalue = label if not isinstance(label, tuple) else "&".join([str(x) for x in label])
+        if str(xvalue) not in scalegroup_ids:
+            scalegroup_ids[str(xvalue)] = "{}.{}".format(rand_int, len(scalegroup_ids))
+        y_vals = sub_data_frame[ysymbols].to_numpy() #one column per Y
+        #no inference band if not requested, or for fewer than 2 rows (cannot compute inf)
+        withinf = inf != "none" and len(sub_data_frame) >= 2
+        #by default for all Ys present (or all those specified)
+        for yindex, ysymbol in enumerate(ysymbols):
             if ylabel is None:
                 yname = ysymbol
             else:
@@ -348,19 +503,32 @@ def ttest_bayes_ci(x_val, iterations=1000, credible_mass=0.95):
                 ylabelindex += 1
                 print("NOTE: ylabel {} -> {}".format(ysymbol, yname))
             #x = ["&".join(r) for r in sub_data_frame[xsymbols].values]
-            y_val = sub_data_frame[ysymbol].values
-            if len(y_val) < 2: #cannot compute inf
+            y_val = y_vals[:, yindex]
+            if withinf: #missing values do not count
+                numvalues = y_counts.loc[label, ysymbol] if inf != "iqr" \
+                    else np.count_nonzero(~pd.isna(y_val))
+            if not withinf or numvalues < 2: #cannot compute inf
                 y_lo, y_hi = (None, None)
+            elif inf == "iqr":
+                y_lo, y_hi = iqr(y_val)
             else:
-                y_lo, y_hi = ttest_bayes_ci(y_val, iterations=hdi_iter,
+                y_stats = (y_means.loc[label, ysymbol], y_stds.loc[label, ysymbol],
+                           y_counts.loc[label, ysymbol])
+                y_lo, y_hi = ttest_bayes_ci(*y_stats, iterations=hdi_iter,
                                             credible_mass=conf_level) if inf == "hdi" \
-                    else t_test_ci(y_val, conf_level=conf_level) if inf == "ci" \
-                    else np.quantile(y_val, [0.25, 0.75]) if inf == "iqr" \
-                    else (None, None)
+                    else t_test_ci(*y_stats, conf_level=conf_level)
             #print("confidence: {} .. {}".format(y_lo, y_hi))
+            kde_val, bandwidth, outliers = (y_val, None, None)
+            if densitymaxpoints != 0 and densitymaxpoints < len(y_val):
+                #the density curve is drawn from quantiles standing for all values
+                kde_val = np.sort(y_val[~pd.isna(y_val)]) #sorted once for all the quantiles
+                if len(kde_val) > densitymaxpoints:
+                    bandwidth = silverman_bandwidth(kde_val)
+                    outliers = sorted_outliers(kde_val)
+                    kde_val = sorted_quantiles(kde_val, np.linspace(0, 1, densitymaxpoints))
             #y_mode = maximum(modes(y_val))
             if xsuperimposed:
-                thislabel = str(sub_data_frame[xsymbols].iloc[0][0])
+                thislabel = str(label if not isinstance(label, tuple) else label[0])
                 if xlabel is None:
                     x_0 = " " if len(xsymbols) == 1 else thislabel
                 else:
@@ -372,7 +540,7 @@ def ttest_bayes_ci(x_val, iterations=1000, credible_mass=0.95):
                 if len(xsymbols) == 1:
                     x_1 = xvalue
                 else:
-                    x_1 = str(sub_data_frame[xsymbols].iloc[0][-1])
+                    x_1 = str(label[-1])
             else:
                 x_0 = xvalue
                 x_1 = xvalue
@@ -383,11 +551,15 @@ def ttest_bayes_ci(x_val, iterations=1000, credible_mass=0.95):
 
             data = {
                 'xvalue': str(xvalue),
+                'scalegroup': scalegroup_ids[str(xvalue)],
                 'xname': xname,
                 'yname': yname,
                 'x_0': x_0,
                 'x_1': x_1,
                 'y_val': y_val,
+                'kde_val': kde_val,
+                'bandwidth': bandwidth,
+                'outliers': outliers,
                 #mode=y_mode,
                 'lo': y_lo,
                 'hi': y_hi
@@ -449,14 +621,11 @@ def ttest_bayes_ci(x_val, iterations=1000, credible_mass=0.95):
         colorend = 350
 
     colorstep = colorend // colorarraylength #integer division
-    fillcolors = ["hsla({}, 50%, 50%, 0.3)".format(j) for j in
-                  range(colorstart, colorend + 1, colorstep)]
-    linecolors = ["hsla({}, 20%, 20%, 0.8)".format(j) for j in
-                  range(colorstart, colorend + 1, colorstep)]
-    markerlinecolors = ["hsla({}, 20%, 20%, 0.4)".format(j) for j in
-                        range(colorstart, colorend + 1, colorstep)]
-    markerfillcolors = ["hsla({}, 70%, 70%, 1)".format(j) for j in
-                        range(colorstart, colorend + 1, colorstep)]
+    hues = range(colorstart, colorend + 1, colorstep)
+    fillcolors = [_FILL_COLOR % j for j in hues]
+    linecolors = [_LINE_COLOR % j for j in hues]
+    markerlinecolors = [_MARKERLINE_COLOR % j for j in hues]
+    markerfillcolors = [_MARKERFILL_COLOR % j for j in hues]
     if pointshapes is not None: #override given
         if isinstance(pointshapes, list):
             markersymbols = pointshapes
@@ -469,14 +638,17 @@ def ttest_bayes_ci(x_val, iterations=1000, credible_mass=0.95):
                          "triangle-down", "pentagon", "hexagon", "star",
                          "hexagram", "star-triangle-up",
                          "star-square", "star-diamond"]
-        shuffle(markersymbols) #change randomly symbols at each call of the function
+        if seed is None: #change symbols at each call of the function
+            _call_counter += 1
+            symbolshift = _call_counter % len(markersymbols)
+        else:
+            symbolshift = seed % len(markersymbols)
+        markersymbols = markersymbols[symbolshift:] + markersymbols[:symbolshift]
 
-    cifillcolors = ["hsla({}, 45%, 45%, 0.4)".format(j) for j in
-                    range(colorstart, colorend + 1, colorstep)]
-    boxlinecolors = ["hsla({}, 30%, 30%, 1)".format(j) for j in
-                     range(colorstart, colorend + 1, colorstep)]
-    outliercolors = ["hsla({}, 50%, 50%, 0.9)".format(j) for j in
-                     range(colorstart, colorend + 1, colorstep)]
+    cifillcolors = [_CIFILL_COLOR % j for j in hues]
+    boxlinecolors = [_BOXLINE_COLOR % j for j in hues]
+    outliercolors = [_OUTLIER_COLOR % j for j in hues]
+    palette_len = len(fillcolors) #all palettes share the same hues
 
     # # 4) Define traces:
 
@@ -500,117 +672,170 @@ def ttest_bayes_ci(x_val, iterations=1000, credible_mass=0.95):
         else:
             label_seen[label] = True
 
-        traces.append(
-            go.Violin( # main trace: kernel density + raw data + meanline
-                orientation=orientation,
-                x0=data['x_0'] if orientation == "v" else None,
-                x=None if orientation == "v" else data['y_val'],
-                y0=None if orientation == "v" else data['x_0'],
-                y=data['y_val'] if orientation == "v" else None,
-                width=0,
-                name=label,
-                showlegend=showlegend,
-                points="all" if showpoints and (pointsmaxdisplayed == 0 or \
-                                                pointsmaxdisplayed >= len(data['y_val'])) \
-                             else False,
-                jitter=jitter,
-                pointpos=pointpositions[sides_x[data['x_1']] % len(pointpositions)] \
-                         if xsuperimposed \
-                         else pointpositions[i % len(pointpositions)],
-                spanmode=spanmode,
-                scalemode="count",
-                scalegroup=data['xvalue'] + str(rand_int),
-                legendgroup=legendgroup,
-                line={'width': 1, 'color': linecolors[i % len(linecolors)]},
-                side=sides[sides_x[data['x_1']] % len(sides)] \
-                     if xsuperimposed else sides[i % len(sides)],
-                #text="mode: ".format(data['mode']),
-                hoveron="points+kde+violins",
-                hoverinfo="y+name+text" if orientation == "v" else "x+name+text",
-                hoverlabel={'bgcolor': cifillcolors[i % len(cifillcolors)]},
-                meanline={'visible': True, 'width': 1, 'color': linecolors[i % len(linecolors)]},
-                fillcolor=fillcolors[i % len(fillcolors)],
-                marker={'opacity': pointsopacity, 'size': 9, \
-                        'color': markerfillcolors[i % len(markerfillcolors)], \
-                        'line': {'width': 0.5, \
-                                 'color': markerlinecolors[i % len(markerlinecolors)]}, \
-                        'symbol': markersymbols[i % len(markersymbols)]}
-            ) #violin
-        ) #append
+        colorindex = i % palette_len
+        markersymbol = markersymbols[i % len(markersymbols)]
+        sidepos = sides_x[data['x_1']] if xsuperimposed else i
+        thisside = sides[sidepos % len(sides)]
+        thispointpos = pointpositions[sidepos % len(pointpositions)]
+
         if showpoints and pointsmaxdisplayed != 0 and pointsmaxdisplayed < len(data['y_val']):
             #if only a reduced number of points needs to be displayed
-            traces.append(
-                go.Violin( #optional trace: points by themselves
-                    orientation=orientation,
-                    x0=data['x_0'] if orientation == "v" else None,
-                    x=None if orientation == "v" else data['y_val'][0:pointsmaxdisplayed],
-                    y0=None if orientation == "v" else data['x_0'],
-                    y=data['y_val'][0:pointsmaxdisplayed] if orientation == "v" else None,
-                    width=0,
-                    name="",
-                    showlegend=False,
-                    scalegroup=data['xvalue'] + str(rand_int),
-                    legendgroup=legendgroup,
-                    #hoverinfo="none",
-                    points="all",
-                    hoveron="points",
-                    hoverinfo="y" if orientation == "v" else "x",
-                    jitter=jitter,
-                    pointpos=pointpositions[sides_x[data['x_1']] % len(pointpositions)] \
-                             if xsuperimposed \
-                             else pointpositions[i % len(pointpositions)],
-                    meanline_visible=False,
-                    box_visible=False,
-                    spanmode=spanmode,
-                    fillcolor="rgba(0, 0, 0, 0)",
-                    line={'width': 0, 'color': "rgba(0, 0, 0, 0)"},
-                    side=sides[sides_x[data['x_1']] % len(sides)] \
-                         if xsuperimposed else sides[i % len(sides)],
-                    marker={'opacity': pointsopacity, 'size': 9, \
-                            'color': markerfillcolors[i % len(markerfillcolors)], \
-                            'line': {'width': 0.5,
-                                     'color': markerlinecolors[i % len(markerlinecolors)]}, \
-                            'symbol': markersymbols[i % len(markersymbols)] \
-                            }
-                ) #optional trace for reduced number of points
-            ) #push
+            #(the kernel density is still drawn from all values or their quantiles)
+            shownpoints = rng.choice(data['y_val'], size=pointsmaxdisplayed, replace=False)
+        elif showpoints and data['bandwidth'] is not None:
+            #density drawn from quantiles: raw points need a trace of their own
+            shownpoints = data['y_val']
+        else:
+            shownpoints = None
+
+        if data['bandwidth'] is not None:
+            #density drawn from quantiles: the invisible violins (raw points, outliers)
+            #stay out of the scalegroup (their counts would rescale the others) and get
+            #a bandwidth as wide as the data, which keeps plotly's density computation trivial
+            hiddenbandwidth = data['kde_val'][-1] - data['kde_val'][0]
+
+        traces.append({ # main trace: kernel density + raw data + meanline
+            'type': "violin",
+            'orientation': orientation,
+            **violin_data(orientation, data['x_0'], data['kde_val']),
+            'bandwidth': data['bandwidth'],
+            'width': 0,
+            'name': label,
+            'showlegend': showlegend,
+            'points': "all" if showpoints and shownpoints is None and not webgl else False,
+            'jitter': jitter,
+            'pointpos': thispointpos,
+            'spanmode': spanmode,
+            'scalemode': "count",
+            'scalegroup': data['scalegroup'],
+            'legendgroup': legendgroup,
+            'line': {'width': 1, 'color': linecolors[colorindex]},
+            'side': thisside,
+            #'text': "mode: ".format(data['mode']),
+            'hoveron': "points+kde+violins",
+            'hoverinfo': "y+name+text" if orientation == "v" else "x+name+text",
+            'hoverlabel': {'bgcolor': cifillcolors[colorindex]},
+            'meanline': {'visible': True, 'width': 1, 'color': linecolors[colorindex]},
+            'fillcolor': fillcolors[colorindex],
+            'marker': {'opacity': pointsopacity, 'size': 9, \
+                       'color': markerfillcolors[colorindex], \
+                       'line': {'width': 0.5, \
+                                'color': markerlinecolors[colorindex]}, \
+                       'symbol': markersymbol}
+        }) #violin
+        if shownpoints is not None and not webgl:
+            if data['bandwidth'] is None:
+                pointsscalegroup, pointsbandwidth = (data['scalegroup'], None)
+            else:
+                pointsscalegroup, pointsbandwidth = ("", hiddenbandwidth)
+            traces.append({ #optional trace: points by themselves
+                'type': "violin",
+                'orientation': orientation,
+                **violin_data(orientation, data['x_0'], shownpoints),
+                'bandwidth': pointsbandwidth,
+                'width': 0,
+                'name': "",
+                'showlegend': False,
+                'scalegroup': pointsscalegroup,
+                'legendgroup': legendgroup,
+                #'hoverinfo': "none",
+                'points': "all",
+                'hoveron': "points",
+                'hoverinfo': "y" if orientation == "v" else "x",
+                'jitter': jitter,
+                'pointpos': thispointpos,
+                'meanline': {'visible': False},
+                'box': {'visible': False},
+                'spanmode': spanmode,
+                'fillcolor': "rgba(0, 0, 0, 0)",
+                'line': {'width': 0, 'color': "rgba(0, 0, 0, 0)"},
+                'side': thisside,
+                'marker': {'opacity': pointsopacity, 'size': 9, \
+                           'color': markerfillcolors[colorindex], \
+                           'line': {'width': 0.5,
+                                    'color': markerlinecolors[colorindex]}, \
+                           'symbol': markersymbol \
+                           }
+            }) #optional trace for reduced number of points
         #end if pointsmaxdisplayed != 0
+        if showpoints and webgl:
+            glpoints = data['y_val'] if shownpoints is None else shownpoints
+            glbase = [data['x_0']] * len(glpoints)
+            traces.append({ #optional trace: points rendered with WebGL
+                'type': "scattergl",
+                'x': glbase if orientation == "v" else glpoints,
+                'y': glpoints if orientation == "v" else glbase,
+                'mode': "markers",
+                'name': "",
+                'showlegend': False,
+                'legendgroup': legendgroup,
+                'hoverinfo': "y" if orientation == "v" else "x",
+                'marker': {'opacity': pointsopacity, 'size': 9, \
+                           'color': markerfillcolors[colorindex], \
+                           'line': {'width': 0.5,
+                                    'color': markerlinecolors[colorindex]}, \
+                           'symbol': markersymbol \
+                           }
+            }) #optional trace for WebGL points
+        #end if webgl
         if data['lo'] is not None:
-            traces.append(
-                go.Violin( #secondary trace: interval band
-                    orientation=orientation,
-                    x0=data['x_0'] if orientation == "v" else None,
-                    x=None if orientation == "v" else data['y_val'],
-                    y0=None if orientation == "v" else data['x_0'],
-                    y=data['y_val'] if orientation == "v" else None,
-                    width=0,
-                    #name=data.yname,
-                    name="",
-                    showlegend=False,
-                    #scalemode="count",
-                    scalegroup=data['xvalue'] + str(rand_int),
-                    legendgroup=legendgroup,
-                    hoverinfo="none",
-                    points="outliers" if markoutliers else False,
-                    jitter=0,
-                    pointpos=0,
-                    meanline_visible=False,
-                    box_visible=showboxplot,
-                    box={'fillcolor': "rgba(0, 0, 0, 0)", 'width': 0.25, \
-                         'line_color': boxlinecolors[i % len(boxlinecolors)], 'line_width': 0.5},
-                    spanmode="manual",
-                    span=(data['lo'], data['hi']),
-                    line_width=0,
-                    fillcolor=cifillcolors[i % len(cifillcolors)],
-                    side=sides[sides_x[data['x_1']] % len(sides)] \
-                         if xsuperimposed else sides[i % len(sides)],
-                    marker={'size': 11, #OUTLIERS ONLY
-                            'symbol': markersymbols[i % len(markersymbols)], \
-                            'color': outliercolors[i % len(outliercolors)], \
-                            'line': {'width': 0.5,
-                                     'color': markerlinecolors[i % len(markerlinecolors)]}}
-                ) #second violin trace for interval band
-            ) #push
+            traces.append({ #secondary trace: interval band
+                'type': "violin",
+                'orientation': orientation,
+                #same values as the main trace, for the same scale in the scalegroup
+                **violin_data(orientation, data['x_0'], data['kde_val']),
+                'bandwidth': data['bandwidth'],
+                'width': 0,
+                #'name': data.yname,
+                'name': "",
+                'showlegend': False,
+                #'scalemode': "count",
+                'scalegroup': data['scalegroup'],
+                'legendgroup': legendgroup,
+                'hoverinfo': "none",
+                #(with the density drawn from quantiles, outliers get a trace of their own)
+                'points': "outliers" if markoutliers and data['bandwidth'] is None else False,
+                'jitter': 0,
+                'pointpos': 0,
+                'meanline': {'visible': False},
+                'box': {'visible': showboxplot, 'fillcolor': "rgba(0, 0, 0, 0)", 'width': 0.25, \
+                        'line': {'color': boxlinecolors[colorindex], 'width': 0.5}},
+                'spanmode': "manual",
+                'span': (data['lo'], data['hi']),
+                'line': {'width': 0},
+                'fillcolor': cifillcolors[colorindex],
+                'side': thisside,
+                'marker': {'size': 11, #OUTLIERS ONLY
+                           'symbol': markersymbol, \
+                           'color': outliercolors[colorindex], \
+                           'line': {'width': 0.5,
+                                    'color': markerlinecolors[colorindex]}}
+            }) #second violin trace for interval band
+            if markoutliers and data['outliers'] is not None and len(data['outliers']) > 0:
+                traces.append({ #optional trace: outliers among all the values
+                    'type': "violin",
+                    'orientation': orientation,
+                    **violin_data(orientation, data['x_0'], data['outliers']),
+                    'bandwidth': hiddenbandwidth,
+                    'width': 0,
+                    'name': "",
+                    'showlegend': False,
+                    'legendgroup': legendgroup,
+                    'hoverinfo': "none",
+                    'points': "all",
+                    'jitter': 0,
+                    'pointpos': 0,
+                    'meanline': {'visible': False},
+                    'box': {'visible': False},
+                    'fillcolor': "rgba(0, 0, 0, 0)",
+                    'line': {'width': 0, 'color': "rgba(0, 0, 0, 0)"},
+                    'side': thisside,
+                    'marker': {'size': 11, #OUTLIERS ONLY
+                               'symbol': markersymbol, \
+                               'color': outliercolors[colorindex], \
+                               'line': {'width': 0.5,
+                                        'color': markerlinecolors[colorindex]}}
+                }) #optional trace for outliers
         #end if data.lo is not None
     #end for data in datas
 